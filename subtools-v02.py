@@ -5,13 +5,24 @@ import subprocess
 import ffmpeg
 import yt_dlp
 import webvtt
-from urllib.parse import urlparse, urlunparse
+from urllib.parse import urlparse, urlunparse, parse_qs
 from bs4 import BeautifulSoup
 import codecs
+import contextlib
+import io
 import math
 import datetime
 import sys
 import shlex
+import sqlite3
+import unicodedata
+import json
+import time
+import signal
+import threading
+import multiprocessing
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pysrt import SubRipFile, SubRipItem
 import pysubs2
 
@@ -106,13 +117,12 @@ class Scaling:
     def __call__(self, x, y):
         return self.scale(x, y)
 
-def convert_to_ass(content, outfile_name, scaling):
-    """Convert TTML to ASS format."""
-    outfile = codecs.open(outfile_name, 'w', encoding='utf8')
+def convert_to_ass(content, outfile, scaling, title=''):
+    """Convert TTML to ASS format, writing to an open text stream."""
     soup = BeautifulSoup(content, features="xml")
 
     info = f"""[Script Info]
-    Title: {outfile_name}
+    Title: {title}
     ScriptType: v4.00+
     WrapStyle: 0
     PlayResX: {scaling.fw}
@@ -151,9 +161,8 @@ def convert_to_ass(content, outfile_name, scaling):
             print(dialog, file=outfile)
 
 
-def convert_to_srt(content, outfile_name, scaling):
-    """Convert TTML to SRT format with line break adjustments."""
-    outfile = codecs.open(outfile_name, 'w', encoding='utf8')
+def convert_to_srt(content, outfile, scaling):
+    """Convert TTML to SRT format with line break adjustments, writing to an open text stream."""
     soup = BeautifulSoup(content, features="xml")
 
     cuepoints = soup.cuepoints
@@ -185,6 +194,18 @@ def convert_to_srt(content, outfile_name, scaling):
         print("", file=outfile)
 
 
+def convert_ttml_content(content, extension='srt', title=''):
+    """Convert TTML content to SRT or ASS text."""
+    scaling = Scaling(1600, 900, 640, 360)
+    outfile = io.StringIO()
+    if extension == 'srt':
+        convert_to_srt(content, outfile, scaling)
+    elif extension == 'ass':
+        convert_to_ass(content, outfile, scaling, title)
+    else:
+        raise ValueError(f"Unsupported output format: {extension}")
+    return outfile.getvalue()
+
 def parse_ttml_file(infile, user_outfile=None, extension='srt'):
     """Parse and convert TTML files."""
     if user_outfile:
@@ -195,30 +216,36 @@ def parse_ttml_file(infile, user_outfile=None, extension='srt'):
     with open(infile, 'r', encoding='utf8') as f:
         content = f.read()
 
-    scaling = Scaling(1600, 900, 640, 360)
-    if extension == 'srt':
-        convert_to_srt(content, outfile, scaling)
-    elif extension == 'ass':
-        convert_to_ass(content, outfile, scaling)
-    else:
+    if extension not in ('srt', 'ass'):
         print("Unsupported output format.")
+        return
+
+    with codecs.open(outfile, 'w', encoding='utf8') as f:
+        f.write(convert_ttml_content(content, extension, title=outfile))
+    update_subtitle_index(outfile)
 
 
 # === Subtitle Cleaning ===
+def clean_srt_content(content):
+    """Strip VTT headers and stray glyphs left over in downloaded SRT text."""
+    content = re.sub(r'[\\h📱🔊📺]', '', content)
+    content = re.sub(r"WEBVTT\n", "", content)
+    content = re.sub(r"X-TIMESTAMP-MAP=.+\n", "", content)
+    return content
+
 def clean_srt_file(srt_file_path):
     new_file_path = os.path.splitext(srt_file_path)[0] + ".cleaned.srt"
     with open(srt_file_path, "r") as file:
         content = file.read()
 
     # Perform cleaning
-    content = re.sub(r'[\\h📱🔊📺]', '', content)
-    content = re.sub(r"WEBVTT\n", "", content)
-    content = re.sub(r"X-TIMESTAMP-MAP=.+\n", "", content)
+    content = clean_srt_content(content)
 
     # Save cleaned content
     with open(new_file_path, "w") as file:
         file.write(content)
 
+    update_subtitle_index(new_file_path)
     return new_file_path
 
 # === Online Subtitle Download ===
@@ -239,6 +266,7 @@ def download_and_convert_vtt_to_srt(vtt_link, srt_file_name):
     # Download and convert
     command = f'ffmpeg -i "{vtt_link}" -c:s subrip "{srt_file_name}"'
     subprocess.call(command, shell=True)
+    update_subtitle_index(srt_file_name)
 
     # Clean the SRT file
     cleaned_srt = clean_srt_file(srt_file_name)
@@ -255,6 +283,7 @@ def download_fod_convert_vtt_to_srt(fod_link):
         ydl.download([fod_link])
 
     webvtt.read(vtt_filename).save_as_srt(srt_filename)
+    update_subtitle_index(srt_filename)
 
     if os.path.exists(vtt_filename):
         os.remove(vtt_filename)
@@ -304,10 +333,8 @@ def download_convert_nhk_caps(nhk_link):
     print(f"NHK TTML conversion completed: {ttml_file_path} -> {output_format}")   
 
 # === Batch VTT to SRT Conversion ===
-def preprocess_vtt(input_file, output_file):
-    with open(input_file, 'r', encoding='utf-8') as f:
-        vtt_content = f.read()
-    
+def preprocess_vtt_content(vtt_content):
+    """Rewrite VTT text as SRT-style text, turning italic tags into ASS overrides."""
     # Cleaning steps for the VTT file
     vtt_content = re.sub(r"^WEBVTT\s*\n", "", vtt_content)
     vtt_content = re.sub(r"(\d{2}:\d{2}:\d{2})[.,](\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2})[.,](\d{3})", r"\1,\2 --> \3,\4", vtt_content)
@@ -317,15 +344,21 @@ def preprocess_vtt(input_file, output_file):
     vtt_content = re.sub(r"</(\w+)>", r"{\\i0}", vtt_content)
     vtt_content = re.sub(r"<[^>]+>", "", vtt_content)
     vtt_content = re.sub(r"position:.*$", "", vtt_content, flags=re.MULTILINE)
+    return vtt_content
+
+def preprocess_vtt(input_file, output_file):
+    with open(input_file, 'r', encoding='utf-8') as f:
+        vtt_content = f.read()
 
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(vtt_content)
+        f.write(preprocess_vtt_content(vtt_content))
 
 def convert_vtt_to_srt(input_file):
     output_file = os.path.splitext(input_file)[0] + ".srt"
     print(f"Converting {input_file} to {output_file}...")
     try:
         preprocess_vtt(input_file, output_file)
+        update_subtitle_index(output_file)
     except Exception as e:
         print(f"Error converting {input_file}: {e}")
 
@@ -424,6 +457,19 @@ def clean_ass_text(text):
     text = re.sub(r'\\N\s*$', '', text)
     return text.strip()
 
+def cleanup_ass_content(content, warnings=None):
+    """Strip formatting from ASS text, convert it to SRT, and merge overlapping lines.
+
+    Messages about skipped lines are appended to `warnings` when a list is given.
+    """
+    subs = pysubs2.SSAFile.from_string(content)
+
+    # Clean each line
+    for event in subs.events:
+        event.text = clean_ass_text(event.text)
+
+    return fix_overlapping_content(subs.to_string("srt"), warnings)
+
 def cleanup_ass_file(input_file, output_file=None):
     """Cleans up an .ass subtitle file by removing formatting codes and converting to SRT."""
     # Normalize path
@@ -439,23 +485,16 @@ def cleanup_ass_file(input_file, output_file=None):
         output_file = f"{base}.cleaned.srt"
     
     try:
-        # Load the subtitle file
-        subs = pysubs2.load(input_file)
-        
-        # Clean each line
-        for event in subs.events:
-            event.text = clean_ass_text(event.text)
-        
-        # Save directly as SRT (no need for temporary file)
-        temp_file = f"{os.path.splitext(input_file)[0]}.temp.srt"
-        subs.save(temp_file, format_="srt")
-        
-        # Now fix overlapping subtitles
-        fix_overlapping_subtitles(temp_file)
-        
-        # Clean up temp file
-        os.rename(f"{os.path.splitext(temp_file)[0]}.fixed.srt", output_file)
-        os.remove(temp_file)
+        with open(input_file, "r", encoding="utf-8") as infile:
+            content = infile.read()
+
+        # Clean, convert to SRT and fix overlaps in memory (no temporary file)
+        warnings = []
+        with open(output_file, "w", encoding="utf-8") as outfile:
+            outfile.write(cleanup_ass_content(content, warnings))
+        for warning in warnings:
+            print(f"Warning: {warning}")
+        update_subtitle_index(output_file)
         
         print(f"✅ ASS file cleaned, converted to SRT, and fixed: {output_file}")
         return output_file
@@ -464,83 +503,57 @@ def cleanup_ass_file(input_file, output_file=None):
         print(f"Error processing file: {e}")
         return None    
 
-def fix_overlapping_subtitles(input_file):
-    """Fix overlapping subtitles in an SRT file."""
-    # Normalize file path
-    input_file = normalize_path(input_file)
-
-    if not os.path.exists(input_file):
-        print(f"Error: Input file '{input_file}' does not exist.")
-        return
-
-    # Generate the output file path in the same directory
-    base, ext = os.path.splitext(input_file)
-    output_file = f"{base}.fixed{ext}"
+def fix_overlapping_content(content, warnings=None):
+    """Merge SRT entries that share the same timing and renumber them.
 
+    Malformed lines are skipped; a message for each is appended to `warnings`
+    when a list is given.
+    """
     # Parse SRT into structured format
     subtitles = []
     current_subtitle = None
-    
-    try:
-        with open(input_file, "r", encoding="utf-8") as infile:
-            lines = infile.readlines()
+    lines = content.splitlines()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        
+        # Skip empty lines
+        if not line:
+            i += 1
+            continue
+        
+        # Start of a new subtitle entry
+        if line.isdigit():
+            # Save previous subtitle if it exists
+            if current_subtitle and 'timing' in current_subtitle:
+                subtitles.append(current_subtitle)
             
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                
-                # Skip empty lines
-                if not line:
-                    i += 1
-                    continue
-                
-                # Start of a new subtitle entry
-                if line.isdigit():
-                    # Save previous subtitle if it exists
-                    if current_subtitle and 'timing' in current_subtitle:
-                        subtitles.append(current_subtitle)
-                    
-                    # Start new subtitle
-                    current_subtitle = {'index': int(line), 'text': []}
-                    i += 1
-                    continue
-                
-                # Timing line (make sure it contains " --> ")
-                if " --> " in line and not 'timing' in current_subtitle:
-                    current_subtitle['timing'] = line
-                    i += 1
-                    continue
-                
-                # Text lines
-                if current_subtitle and 'timing' in current_subtitle:
-                    current_subtitle['text'].append(line)
-                    i += 1
-                    continue
-                
-                # If we get here, something's wrong with the format, skip this line
-                print(f"Warning: Skipping malformed line: {line}")
-                i += 1
+            # Start new subtitle
+            current_subtitle = {'index': int(line), 'text': []}
+            i += 1
+            continue
         
-        # Add the last subtitle
+        # Timing line (make sure it contains " --> ")
+        if " --> " in line and current_subtitle and 'timing' not in current_subtitle:
+            current_subtitle['timing'] = line
+            i += 1
+            continue
+        
+        # Text lines
         if current_subtitle and 'timing' in current_subtitle:
-            subtitles.append(current_subtitle)
-    
-    except UnicodeDecodeError:
-        # Try different encodings if UTF-8 fails
-        try:
-            with open(input_file, "r", encoding="shift-jis") as infile:
-                # (re-implement the same parsing logic here)
-                # ...
-                pass
-        except:
-            try:
-                with open(input_file, "r", encoding="cp932") as infile:
-                    # (re-implement the same parsing logic here)
-                    # ...
-                    pass
-            except:
-                print(f"Error: Could not decode the file with UTF-8, Shift-JIS, or CP932 encodings.")
-                return
+            current_subtitle['text'].append(line)
+            i += 1
+            continue
+        
+        # If we get here, something's wrong with the format, skip this line
+        if warnings is not None:
+            warnings.append(f"Skipping malformed line: {line}")
+        i += 1
+
+    # Add the last subtitle
+    if current_subtitle and 'timing' in current_subtitle:
+        subtitles.append(current_subtitle)
     
     # Process subtitles to merge overlapping entries
     merged_subtitles = []
@@ -570,13 +583,48 @@ def fix_overlapping_subtitles(input_file):
     # Sort by timing
     merged_subtitles.sort(key=lambda x: x['index'])
     
+    output = io.StringIO()
+    for sub in merged_subtitles:
+        output.write(f"{sub['index']}\n")
+        output.write(f"{sub['timing']}\n")
+        output.write("\n".join(sub['text']) + "\n\n")
+    return output.getvalue()
+
+def fix_overlapping_subtitles(input_file):
+    """Fix overlapping subtitles in an SRT file."""
+    # Normalize file path
+    input_file = normalize_path(input_file)
+
+    if not os.path.exists(input_file):
+        print(f"Error: Input file '{input_file}' does not exist.")
+        return
+
+    # Generate the output file path in the same directory
+    base, ext = os.path.splitext(input_file)
+    output_file = f"{base}.fixed{ext}"
+
+    # Try different encodings if UTF-8 fails
+    content = None
+    for encoding in ("utf-8", "shift-jis", "cp932"):
+        try:
+            with open(input_file, "r", encoding=encoding) as infile:
+                content = infile.read()
+            break
+        except UnicodeDecodeError:
+            continue
+
+    if content is None:
+        print(f"Error: Could not decode the file with UTF-8, Shift-JIS, or CP932 encodings.")
+        return
+
     # Write output
+    warnings = []
     with open(output_file, "w", encoding="utf-8") as outfile:
-        for sub in merged_subtitles:
-            outfile.write(f"{sub['index']}\n")
-            outfile.write(f"{sub['timing']}\n")
-            outfile.write("\n".join(sub['text']) + "\n\n")
+        outfile.write(fix_overlapping_content(content, warnings))
+    for warning in warnings:
+        print(f"Warning: {warning}")
     
+    update_subtitle_index(output_file)
     print(f"✅ Overlapping subtitles fixed and saved to {output_file}.")
 
 
@@ -591,7 +639,19 @@ def merge_duplicate_subtitles01(input_srt):
         print(f"❌ Error: File '{input_srt}' not found.")
         return
     
-    subs = SubRipFile.open(input_srt)
+    merged_srt = merge_duplicate_items(SubRipFile.open(input_srt))
+    
+    # Define output filename
+    output_srt = os.path.splitext(input_srt)[0] + "_merged.srt"
+    
+    # Save the modified SRT file
+    merged_srt.save(output_srt, encoding='utf-8')
+    update_subtitle_index(output_srt)
+    
+    print(f"✅ Process complete! Merged subtitles saved to: {output_srt}")
+
+def merge_duplicate_items(subs):
+    """Collapse consecutive entries with identical text into one spanning entry."""
     merged_subs = []
     
     i = 0
@@ -608,15 +668,15 @@ def merge_duplicate_subtitles01(input_srt):
         merged_subs.append(SubRipItem(index=len(merged_subs) + 1, start=start_time, end=end_time, text=text))
         i = j  # Move to the next non-duplicate entry
     
-    # Define output filename
-    output_srt = os.path.splitext(input_srt)[0] + "_merged.srt"
-    
-    # Save the modified SRT file
     merged_srt = SubRipFile()
     merged_srt.extend(merged_subs)
-    merged_srt.save(output_srt, encoding='utf-8')
-    
-    print(f"✅ Process complete! Merged subtitles saved to: {output_srt}")
+    return merged_srt
+
+def merge_duplicate_content(content):
+    """De-dupe and merge consecutive identical lines in SRT text."""
+    output = io.StringIO()
+    merge_duplicate_items(SubRipFile.from_string(content)).write_into(output)
+    return output.getvalue()
 
 def clean_ass_text(text):
     # Remove override tags (e.g., {\an8}, {\pos(320,240)}, {\c&HFF0000&})
@@ -624,6 +684,614 @@ def clean_ass_text(text):
     return text.strip()  
 
 
+# === Bilingual Track Alignment ===
+def load_subtitle_track(input_file):
+    """Load an SRT/ASS/VTT file as a list of cues sorted by start time (in ms).
+
+    Each cue keeps a 'number': the cue number written in the file for SRT,
+    or the 1-based position of the event in the file for other formats.
+    """
+    input_file = normalize_path(input_file)
+    if input_file.lower().endswith(".srt"):
+        # pysrt keeps the cue numbers as written, pysubs2 discards them
+        events = [
+            (item.index, item.start.ordinal, item.end.ordinal, clean_ass_text(item.text_without_tags))
+            for item in SubRipFile.open(input_file)
+        ]
+    else:
+        events = [
+            (number, event.start, event.end, event.plaintext)
+            for number, event in enumerate(pysubs2.load(input_file).events, start=1)
+            if not event.is_comment
+        ]
+
+    cues = []
+    for number, start, end, text in events:
+        text = text.strip()
+        if text and end > start:
+            cues.append({'number': number, 'start': start, 'end': end, 'text': text})
+    cues.sort(key=lambda cue: (cue['start'], cue['end']))
+    return cues
+
+class CueIndex:
+    """Centered interval tree over a track of cues.
+
+    Each node keeps the cues that contain its center point, sorted by start and
+    by end, and hands the cues entirely to its left or right down to its
+    children. An overlap query only visits the nodes on its path plus the cues
+    it reports, so a cue spanning the whole episode doesn't slow lookups down.
+    """
+    def __init__(self, cues):
+        self.cues = sorted(cues, key=lambda cue: (cue['start'], cue['end']))
+        # Zero-length cues can't overlap anything, so they stay out of the tree
+        self.root = self._build([i for i, cue in enumerate(self.cues) if cue['end'] > cue['start']])
+
+    def __len__(self):
+        return len(self.cues)
+
+    def _build(self, positions):
+        """Build a subtree from cue positions given in start order."""
+        if not positions:
+            return None
+        center = self.cues[positions[len(positions) // 2]]['start']
+        left, here, right = [], [], []
+        for i in positions:
+            cue = self.cues[i]
+            if cue['end'] <= center:
+                left.append(i)
+            elif cue['start'] > center:
+                right.append(i)
+            else:
+                here.append(i)
+        return {
+            'center': center,
+            'by_start': here,
+            'by_end': sorted(here, key=lambda i: self.cues[i]['end'], reverse=True),
+            'left': self._build(left),
+            'right': self._build(right),
+        }
+
+    def overlapping(self, start, end):
+        """Return the positions of all cues that overlap the interval [start, end)."""
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            center = node['center']
+            if end <= center:
+                # Node cues all end after the query; keep those starting before it ends
+                for i in node['by_start']:
+                    if self.cues[i]['start'] >= end:
+                        break
+                    found.append(i)
+                stack.append(node['left'])
+            elif start > center:
+                # Node cues all start before the query; keep those ending after it starts
+                for i in node['by_end']:
+                    if self.cues[i]['end'] <= start:
+                        break
+                    found.append(i)
+                stack.append(node['right'])
+            else:
+                # The query contains the center, so every node cue overlaps it
+                found.extend(node['by_start'])
+                stack.append(node['left'])
+                stack.append(node['right'])
+        found.sort()
+        return found
+
+def overlap_ratio(a, b):
+    """Overlap of two cues as a fraction of the shorter cue's duration."""
+    overlap = min(a['end'], b['end']) - max(a['start'], b['start'])
+    shortest = min(a['end'] - a['start'], b['end'] - b['start'])
+    if overlap <= 0 or shortest <= 0:
+        return 0.0
+    return overlap / shortest
+
+def match_score(a, b):
+    """Rank a cue pairing by overlap over union, then by overlap in ms.
+
+    Unlike `overlap_ratio`, a cue shown for the whole episode scores low
+    against short lines, so it can't outbid the cue that actually fits.
+    """
+    overlap = min(a['end'], b['end']) - max(a['start'], b['start'])
+    union = max(a['end'], b['end']) - min(a['start'], b['start'])
+    if overlap <= 0 or union <= 0:
+        return (0.0, 0)
+    return (overlap / union, overlap)
+
+def align_subtitle_tracks(primary, secondary, min_ratio=0.5):
+    """Pair each secondary cue with the primary cue that fits it best.
+
+    A pairing is eligible when the overlap covers at least `min_ratio` of the
+    shorter cue; among eligible primary cues the best `match_score` wins.
+    Returns a list of groups sorted by start time, each holding the primary
+    timing with its primary and matched secondary texts. Secondary cues that
+    match nothing are kept as groups of their own so no line is lost.
+    """
+    primary_index = CueIndex(primary)
+    best = {}  # secondary position -> (score, primary position)
+
+    for s_pos, cue in enumerate(secondary):
+        for p_pos in primary_index.overlapping(cue['start'], cue['end']):
+            candidate = primary_index.cues[p_pos]
+            if overlap_ratio(cue, candidate) < min_ratio:
+                continue
+            score = match_score(cue, candidate)
+            if s_pos not in best or score > best[s_pos][0]:
+                best[s_pos] = (score, p_pos)
+
+    groups = [
+        {'start': cue['start'], 'end': cue['end'], 'primary': [cue['text']], 'secondary': []}
+        for cue in primary_index.cues
+    ]
+    unmatched = []
+    for s_pos, cue in enumerate(secondary):
+        if s_pos in best:
+            groups[best[s_pos][1]]['secondary'].append(cue['text'])
+        else:
+            unmatched.append({'start': cue['start'], 'end': cue['end'], 'primary': [], 'secondary': [cue['text']]})
+
+    groups.extend(unmatched)
+    groups.sort(key=lambda group: (group['start'], group['end']))
+    return groups
+
+def write_bilingual_srt(groups, output_file):
+    """Write aligned groups as an SRT with the secondary text stacked under the primary."""
+    subs = pysubs2.SSAFile()
+    for group in groups:
+        text = "\n".join(group['primary'] + group['secondary'])
+        subs.append(pysubs2.SSAEvent(start=group['start'], end=group['end'], text=text.replace("\n", "\\N")))
+    subs.save(output_file, format_="srt")
+
+def write_bilingual_ass(groups, output_file):
+    """Write aligned groups as a two-layer ASS, primary at the bottom and secondary at the top."""
+    subs = pysubs2.SSAFile()
+    subs.info["PlayResX"] = "640"
+    subs.info["PlayResY"] = "360"
+    subs.styles["Default"] = pysubs2.SSAStyle(fontname="MS UI Gothic", fontsize=24, alignment=pysubs2.Alignment.BOTTOM_CENTER)
+    subs.styles["Secondary"] = pysubs2.SSAStyle(fontname="Arial", fontsize=20, alignment=pysubs2.Alignment.TOP_CENTER)
+    for group in groups:
+        for layer, style, texts in ((0, "Default", group['primary']), (1, "Secondary", group['secondary'])):
+            if texts:
+                text = "\\N".join(texts).replace("\n", "\\N")
+                subs.append(pysubs2.SSAEvent(start=group['start'], end=group['end'], text=text, style=style, layer=layer))
+    subs.save(output_file, format_="ass")
+
+def create_bilingual_subtitles(primary_file, secondary_file, extension='srt', min_ratio=0.5):
+    """Align two subtitle tracks by time and save them as a bilingual SRT or ASS."""
+    primary_file = normalize_path(primary_file)
+    secondary_file = normalize_path(secondary_file)
+
+    for path in (primary_file, secondary_file):
+        if not os.path.exists(path):
+            print(f"Error: Input file '{path}' does not exist.")
+            return None
+
+    output_file = f"{os.path.splitext(primary_file)[0]}.bilingual.{extension}"
+
+    try:
+        groups = align_subtitle_tracks(load_subtitle_track(primary_file), load_subtitle_track(secondary_file), min_ratio)
+        if extension == 'srt':
+            write_bilingual_srt(groups, output_file)
+        elif extension == 'ass':
+            write_bilingual_ass(groups, output_file)
+        else:
+            print("Unsupported output format.")
+            return None
+    except Exception as e:
+        print(f"Error aligning subtitles: {e}")
+        return None
+
+    update_subtitle_index(output_file)
+    print(f"✅ Bilingual subtitles saved to: {output_file}")
+    return output_file
+
+
+# === Subtitle Search Index ===
+INDEX_FILENAME = "subtools_index.db"
+INDEX_EXTENSIONS = (".srt", ".ass")
+NGRAM_SIZE = 2
+INDEX_VERSION = 3
+
+def normalize_search_text(text):
+    """Fold width/case and drop whitespace so Japanese line breaks don't split terms."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return re.sub(r"\s+", "", text)
+
+def text_ngrams(text):
+    """Split normalized text into the set of character n-grams used as index terms."""
+    text = normalize_search_text(text)
+    if len(text) < NGRAM_SIZE:
+        return {text} if text else set()
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+def open_subtitle_index(library_folder):
+    """Open (creating if needed) the index database stored in the library folder."""
+    db = sqlite3.connect(os.path.join(library_folder, INDEX_FILENAME))
+
+    # An index written by an older layout is dropped; the next build re-reads every file
+    if db.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        db.executescript("""
+            DROP TABLE IF EXISTS files;
+            DROP TABLE IF EXISTS cues;
+            DROP TABLE IF EXISTS postings;
+            DROP TABLE IF EXISTS terms;
+        """)
+        db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+
+    # cues.seq is the cue's row within its file; cues.cue is the number shown to users
+    # (the SRT cue number, or the event position for other formats), which need not be unique
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, mtime REAL NOT NULL, size INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS cues (
+            file_id INTEGER NOT NULL, seq INTEGER NOT NULL, cue INTEGER NOT NULL, start_ms INTEGER NOT NULL,
+            text TEXT NOT NULL, search_text TEXT NOT NULL,
+            PRIMARY KEY (file_id, seq)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS postings (
+            term TEXT NOT NULL, file_id INTEGER NOT NULL, seq INTEGER NOT NULL,
+            PRIMARY KEY (term, file_id, seq)) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+        CREATE TABLE IF NOT EXISTS terms (
+            term TEXT PRIMARY KEY, postings INTEGER NOT NULL) WITHOUT ROWID;
+    """)
+    return db
+
+def find_subtitle_index(path):
+    """Return the library folder holding an index that covers `path`, or None."""
+    folder = os.path.dirname(os.path.abspath(path))
+    while True:
+        if os.path.exists(os.path.join(folder, INDEX_FILENAME)):
+            return folder
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+def _drop_indexed_file(db, file_id):
+    counts = db.execute("SELECT term, COUNT(*) FROM postings WHERE file_id = ? GROUP BY term", (file_id,)).fetchall()
+    db.executemany("UPDATE terms SET postings = postings - ? WHERE term = ?", ((count, term) for term, count in counts))
+    db.execute("DELETE FROM terms WHERE postings <= 0")
+    db.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+    db.execute("DELETE FROM cues WHERE file_id = ?", (file_id,))
+    db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+def index_subtitle_file(db, library_folder, path):
+    """(Re)index one subtitle file if it changed since it was last indexed.
+
+    Returns True when the index was modified. Files that no longer exist are
+    removed from the index.
+    """
+    rel_path = os.path.relpath(os.path.abspath(path), library_folder)
+    row = db.execute("SELECT id, mtime, size FROM files WHERE path = ?", (rel_path,)).fetchone()
+
+    if not os.path.exists(path):
+        if row:
+            _drop_indexed_file(db, row[0])
+            return True
+        return False
+
+    stat = os.stat(path)
+    if row and row[1] == stat.st_mtime and row[2] == stat.st_size:
+        return False
+    if row:
+        _drop_indexed_file(db, row[0])
+
+    file_id = db.execute(
+        "INSERT INTO files (path, mtime, size) VALUES (?, ?, ?)", (rel_path, stat.st_mtime, stat.st_size)
+    ).lastrowid
+    term_counts = Counter()
+    for seq, cue in enumerate(load_subtitle_track(path)):
+        terms = text_ngrams(cue['text'])
+        db.execute(
+            "INSERT INTO cues VALUES (?, ?, ?, ?, ?, ?)",
+            (file_id, seq, cue['number'], cue['start'], cue['text'], normalize_search_text(cue['text']))
+        )
+        db.executemany("INSERT INTO postings VALUES (?, ?, ?)", ((term, file_id, seq) for term in terms))
+        term_counts.update(terms)
+
+    # Posting counts per term let searches start from the rarest n-gram
+    db.executemany(
+        "INSERT INTO terms VALUES (?, ?) ON CONFLICT (term) DO UPDATE SET postings = postings + excluded.postings",
+        term_counts.items()
+    )
+    return True
+
+def build_subtitle_index(library_folder):
+    """Incrementally index every subtitle file under the library folder."""
+    library_folder = normalize_path(library_folder)
+    if not os.path.isdir(library_folder):
+        print(f"Error: Directory '{library_folder}' not found.")
+        return
+
+    seen, updated = set(), 0
+    with contextlib.closing(open_subtitle_index(library_folder)) as db, db:
+        for root, _, files in os.walk(library_folder):
+            for file in files:
+                if not file.endswith(INDEX_EXTENSIONS):
+                    continue
+                path = os.path.join(root, file)
+                seen.add(os.path.relpath(path, library_folder))
+                try:
+                    updated += index_subtitle_file(db, library_folder, path)
+                except Exception as e:
+                    print(f"Warning: Could not index {path}: {e}")
+
+        # Forget files that were deleted since the last run
+        for file_id, rel_path in db.execute("SELECT id, path FROM files").fetchall():
+            if rel_path not in seen:
+                _drop_indexed_file(db, file_id)
+                updated += 1
+
+    print(f"✅ Index up to date: {len(seen)} files, {updated} changed ({os.path.join(library_folder, INDEX_FILENAME)})")
+
+def update_subtitle_index(*paths):
+    """Refresh the index entries of newly written outputs, if they live in an indexed library."""
+    for path in paths:
+        if not path or not path.endswith(INDEX_EXTENSIONS):
+            continue
+        library_folder = find_subtitle_index(path)
+        if not library_folder:
+            continue
+        try:
+            with contextlib.closing(open_subtitle_index(library_folder)) as db, db:
+                index_subtitle_file(db, library_folder, path)
+        except Exception as e:
+            print(f"Warning: Could not update subtitle index for {path}: {e}")
+
+def search_subtitle_index(library_folder, query, limit=50):
+    """Return up to `limit` (path, cue number, start ms, text) rows for cues containing the query."""
+    library_folder = normalize_path(library_folder)
+    if not os.path.exists(os.path.join(library_folder, INDEX_FILENAME)):
+        print(f"Error: No subtitle index in '{library_folder}'. Build one first.")
+        return []
+
+    needle = normalize_search_text(query)
+    if not needle:
+        return []
+
+    with contextlib.closing(open_subtitle_index(library_folder)) as db:
+        if len(needle) < NGRAM_SIZE:
+            # Too short to have an n-gram of its own, fall back to scanning the normalized cue text
+            rows = db.execute("""
+                SELECT files.path, cues.cue, cues.start_ms, cues.text
+                FROM cues JOIN files ON files.id = cues.file_id
+                WHERE instr(cues.search_text, ?) > 0
+                LIMIT ?
+            """, (needle, limit)).fetchall()
+        else:
+            terms = text_ngrams(needle)
+            placeholders = ",".join("?" * len(terms))
+            counts = dict(db.execute(f"SELECT term, postings FROM terms WHERE term IN ({placeholders})", tuple(terms)))
+            if len(counts) < len(terms):
+                # Some n-gram never occurs, so neither does the query
+                return []
+
+            # Walk the postings of the rarest n-gram and stop once enough cues really contain the query
+            rarest = min(counts, key=counts.get)
+            rows = db.execute("""
+                SELECT files.path, cues.cue, cues.start_ms, cues.text
+                FROM postings
+                CROSS JOIN cues ON cues.file_id = postings.file_id AND cues.seq = postings.seq
+                JOIN files ON files.id = postings.file_id
+                WHERE postings.term = ? AND instr(cues.search_text, ?) > 0
+                LIMIT ?
+            """, (rarest, needle, limit)).fetchall()
+
+    rows.sort(key=lambda row: (row[0], row[2]))
+    return rows
+
+def print_search_results(results):
+    """Print search hits as `path #cue timestamp  text`."""
+    for path, cue, start_ms, text in results:
+        timestamp = format_time(datetime.timedelta(milliseconds=start_ms))
+        line = text.replace("\n", " / ")
+        print(f"{path} #{cue} {timestamp}  {line}")
+    print(f"{len(results)} match(es) found.")
+
+
+# === Conversion Service ===
+SERVICE_OPERATIONS = {
+    'preprocess_vtt': preprocess_vtt_content,
+    'clean_srt_file': clean_srt_content,
+    'parse_ttml_file': convert_ttml_content,
+    'fix_overlapping_subtitles': fix_overlapping_content,
+    'dedupe': merge_duplicate_content,
+    'cleanup_ass_file': cleanup_ass_content,
+}
+# Query parameters passed through to an operation, e.g. /parse_ttml_file?extension=ass
+SERVICE_OPTIONS = {
+    'parse_ttml_file': ('extension', 'title'),
+}
+# Operations that report skipped input lines; the count goes back in X-Subtools-Warnings
+SERVICE_WARNING_OPERATIONS = ('fix_overlapping_subtitles', 'cleanup_ass_file')
+MAX_REQUEST_BYTES = 50 * 1024 * 1024
+LATENCY_SAMPLES = 1000
+
+def run_service_operation(operation, content, options):
+    """Run one conversion on in-memory content (called inside a pool worker).
+
+    Returns the converted text and the list of warnings it produced.
+    """
+    warnings = []
+    if operation in SERVICE_WARNING_OPERATIONS:
+        options = dict(options, warnings=warnings)
+    return SERVICE_OPERATIONS[operation](content, **options), warnings
+
+def _ignore_sigint():
+    # Let the parent handle Ctrl+C and shut the pool down cleanly
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+class ServiceStats:
+    """Thread-safe request, latency and throughput counters for the service."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.in_flight = 0
+        self.rejected = 0
+        self.operations = {}
+
+    def begin(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def reject(self):
+        with self.lock:
+            self.rejected += 1
+
+    def finish(self, operation, latency_ms, ok):
+        with self.lock:
+            self.in_flight -= 1
+            op = self.operations.setdefault(operation, {
+                'requests': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'recent': deque(maxlen=LATENCY_SAMPLES),
+            })
+            op['requests'] += 1
+            op['errors'] += 0 if ok else 1
+            op['total_ms'] += latency_ms
+            op['max_ms'] = max(op['max_ms'], latency_ms)
+            op['recent'].append(latency_ms)
+
+    def snapshot(self):
+        with self.lock:
+            uptime = time.monotonic() - self.started
+            operations = {}
+            for name, op in self.operations.items():
+                recent = sorted(op['recent'])
+                operations[name] = {
+                    'requests': op['requests'],
+                    'errors': op['errors'],
+                    'avg_ms': round(op['total_ms'] / op['requests'], 3),
+                    'p50_ms': round(recent[len(recent) // 2], 3),
+                    'p95_ms': round(recent[int(len(recent) * 0.95)], 3),
+                    'max_ms': round(op['max_ms'], 3),
+                }
+            completed = sum(op['requests'] for op in self.operations.values())
+            return {
+                'uptime_s': round(uptime, 1),
+                'completed': completed,
+                'in_flight': self.in_flight,
+                'rejected': self.rejected,
+                'throughput_rps': round(completed / uptime, 3) if uptime else 0.0,
+                'operations': operations,
+            }
+
+class ConversionServer(ThreadingHTTPServer):
+    """HTTP front end that hands request bodies to a pool of warm worker processes."""
+    daemon_threads = True
+
+    def __init__(self, address, pool, max_pending, request_timeout):
+        super().__init__(address, ConversionRequestHandler)
+        self.pool = pool
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.request_timeout = request_timeout
+        self.stats = ServiceStats()
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """POST /<operation> with the subtitle text as body; GET /stats for counters."""
+
+    def send_text(self, status, text, content_type="text/plain; charset=utf-8", headers=None):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/stats":
+            self.send_text(200, json.dumps(self.server.stats.snapshot(), indent=2), "application/json")
+        else:
+            self.send_text(404, "Not found. Use GET /stats or POST /<operation>.\n")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        operation = url.path.strip("/")
+        if operation not in SERVICE_OPERATIONS:
+            self.send_text(404, f"Unknown operation '{operation}'. Available: {', '.join(SERVICE_OPERATIONS)}\n")
+            return
+
+        # Bodies must be sent with a Content-Length; chunked uploads aren't supported
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower() or self.headers.get("Content-Length") is None:
+            self.send_text(411, "Content-Length required.\n")
+            return
+        try:
+            length = int(self.headers["Content-Length"])
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_text(400, "Bad request: invalid Content-Length.\n")
+            return
+        if length > MAX_REQUEST_BYTES:
+            self.send_text(413, "Request body too large.\n")
+            return
+
+        # Backpressure: refuse instead of queueing without bound when workers are saturated
+        if not self.server.slots.acquire(blocking=False):
+            self.server.stats.reject()
+            self.send_text(503, "Server busy, retry shortly.\n", headers={"Retry-After": "1"})
+            return
+
+        stats = self.server.stats
+        stats.begin()
+        started = time.perf_counter()
+        ok = False
+        submitted = False
+        release_slot = lambda _: self.server.slots.release()
+        try:
+            content = self.rfile.read(length).decode("utf-8-sig")
+            query = parse_qs(url.query)
+            options = {key: query[key][-1] for key in SERVICE_OPTIONS.get(operation, ()) if key in query}
+            # The slot is freed when the worker finishes, not when we stop waiting,
+            # so timed-out tasks still count against the pending limit
+            result = self.server.pool.apply_async(
+                run_service_operation, (operation, content, options),
+                callback=release_slot, error_callback=release_slot
+            )
+            submitted = True
+            output, warnings = result.get(self.server.request_timeout)
+            ok = True
+        except multiprocessing.TimeoutError:
+            self.send_text(504, "Conversion timed out.\n")
+        except ValueError as e:
+            self.send_text(400, f"Bad request: {e}\n")
+        except Exception as e:
+            self.send_text(500, f"Conversion failed: {e}\n")
+        finally:
+            stats.finish(operation, (time.perf_counter() - started) * 1000, ok)
+            if not submitted:
+                self.server.slots.release()
+
+        if ok:
+            self.send_text(200, output, headers={"X-Subtools-Warnings": str(len(warnings))})
+
+    def log_message(self, format, *args):
+        # Keep the console quiet; per-request numbers are available from /stats
+        pass
+
+def serve_conversions(host="127.0.0.1", port=8765, workers=None, max_pending=None, request_timeout=60):
+    """Run the local conversion service until interrupted."""
+    workers = workers or os.cpu_count() or 2
+    max_pending = max_pending or workers * 4
+
+    # Pool workers are started up front and inherit the already-imported modules
+    with multiprocessing.Pool(processes=workers, initializer=_ignore_sigint) as pool:
+        server = ConversionServer((host, port), pool, max_pending, request_timeout)
+        print(f"🚀 Conversion service on http://{host}:{port} ({workers} workers, {max_pending} max pending)")
+        print(f"Operations: {', '.join(SERVICE_OPERATIONS)}. Counters at GET /stats. Ctrl+C to stop.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopping conversion service.")
+        finally:
+            server.server_close()
+
+
 # === Main Menu ===
 def main():
     print("Select a task:")
@@ -637,8 +1305,12 @@ def main():
     print("8. Overlap fix in SRT")
     print("9. Dedupe merge lines SRT from SUP")
     print("10. Clean Caption2Ass files, convert to SRT, and fix overlaps")
+    print("11. Align two subtitle tracks into bilingual SRT/ASS")
+    print("12. Build/update subtitle search index")
+    print("13. Search subtitle index for a line")
+    print("14. Run local conversion service")
 
-    choice = input("Enter choice (1-10): ").strip()
+    choice = input("Enter choice (1-14): ").strip()
 
     if choice == '1':
         file_path = input("Insert file path here: ").strip()
@@ -712,9 +1384,47 @@ def main():
         else:
             print("ASS file not found.") 
        
+    elif choice == '11':
+        primary_file = input("Enter the path to the primary (e.g. Japanese) subtitle file: ").strip()
+        secondary_file = input("Enter the path to the secondary (e.g. English) subtitle file: ").strip()
+        output_format = input("Enter the desired output format (srt/ass): ").strip()
+        create_bilingual_subtitles(primary_file, secondary_file, extension=output_format)
+
+    elif choice == '12':
+        library_folder = input("Enter the path to the subtitle library folder: ").strip()
+        build_subtitle_index(library_folder)
+
+    elif choice == '13':
+        library_folder = input("Enter the path to the subtitle library folder: ").strip()
+        query = input("Enter the text to search for: ").strip()
+        print_search_results(search_subtitle_index(library_folder, query))
+
+    elif choice == '14':
+        port = input("Enter the port to listen on (default 8765): ").strip()
+        workers = input("Enter the number of worker processes (default: CPU count): ").strip()
+        serve_conversions(port=int(port or 8765), workers=int(workers) if workers else None)
+
 
     else:
         print("Invalid choice. Exiting.")
 
 if __name__ == "__main__":
-    main()
+    # Non-interactive entry points for other tools:
+    #   python subtools-v02.py serve [port] [workers]
+    #   python subtools-v02.py index <folder>
+    #   python subtools-v02.py search <folder> <query>
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "serve":
+        serve_conversions(
+            port=int(sys.argv[2]) if len(sys.argv) > 2 else 8765,
+            workers=int(sys.argv[3]) if len(sys.argv) > 3 else None,
+        )
+    elif command == "index" and len(sys.argv) == 3:
+        build_subtitle_index(sys.argv[2])
+    elif command == "search" and len(sys.argv) >= 4:
+        print_search_results(search_subtitle_index(sys.argv[2], " ".join(sys.argv[3:])))
+    elif command:
+        print("Usage: subtools-v02.py [serve [port] [workers] | index <folder> | search <folder> <query>]")
+        sys.exit(2)
+    else:
+        main()
@@ -0,0 +1,22 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "subtools-v02.py")
+
+
+def load_subtools():
+    if "subtools" not in sys.modules:
+        spec = importlib.util.spec_from_file_location("subtools", SCRIPT)
+        module = importlib.util.module_from_spec(spec)
+        # Registered so pool workers can pickle references to its functions
+        sys.modules["subtools"] = module
+        spec.loader.exec_module(module)
+    return sys.modules["subtools"]
+
+
+@pytest.fixture(scope="session")
+def subtools():
+    return load_subtools()
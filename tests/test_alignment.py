@@ -0,0 +1,78 @@
+import random
+import time
+
+
+def make_track(count, seed, long_cue=False):
+    rng = random.Random(seed)
+    cues, t = [], 0
+    for i in range(count):
+        duration = rng.randint(800, 4000)
+        cues.append({'start': t, 'end': t + duration, 'text': f"line {i}"})
+        t += duration + rng.randint(-300, 500)
+    if long_cue:
+        # A sign/title line shown for the whole episode
+        cues.append({'start': 0, 'end': t + 5000, 'text': "title"})
+    return cues
+
+
+def make_translation(primary, seed):
+    """English cues that follow the primary lines with a little timing jitter."""
+    rng = random.Random(seed)
+    return [
+        {'start': cue['start'] + rng.randint(-100, 100), 'end': cue['end'] + rng.randint(-100, 100),
+         'text': cue['text'].replace("line", "en")}
+        for cue in primary if cue['text'] != "title"
+    ]
+
+
+def matches(groups):
+    """Map each primary text to the secondary texts attached to it."""
+    return {group['primary'][0]: group['secondary'] for group in groups if group['primary']}
+
+
+def test_overlapping_matches_brute_force_with_long_cue(subtools):
+    cues = make_track(500, seed=1, long_cue=True)
+    index = subtools.CueIndex(cues)
+    rng = random.Random(2)
+    for _ in range(300):
+        start = rng.randint(-1000, 900000)
+        end = start + rng.randint(1, 20000)
+        expected = [i for i, cue in enumerate(index.cues) if cue['start'] < end and cue['end'] > start]
+        assert index.overlapping(start, end) == expected
+
+
+def test_long_primary_cue_does_not_take_the_translations(subtools):
+    primary = make_track(2000, seed=3, long_cue=True)
+    groups = subtools.align_subtitle_tracks(primary, make_translation(primary, seed=4))
+    matched = matches(groups)
+    assert matched["title"] == []
+    for i in range(2000):
+        assert matched[f"line {i}"] == [f"en {i}"]
+
+
+def test_long_secondary_cue_goes_to_the_best_fitting_primary(subtools):
+    primary = [
+        {'start': 0, 'end': 1000, 'text': "short"},
+        {'start': 1000, 'end': 5000, 'text': "long"},
+    ]
+    secondary = [{'start': 0, 'end': 5000, 'text': "spanning"}]
+    matched = matches(subtools.align_subtitle_tracks(primary, secondary))
+    assert matched == {"short": [], "long": ["spanning"]}
+
+
+def test_unmatched_secondary_cue_keeps_its_own_timing(subtools):
+    primary = [{'start': 0, 'end': 1000, 'text': "ja"}]
+    secondary = [{'start': 5000, 'end': 6000, 'text': "en"}]
+    groups = subtools.align_subtitle_tracks(primary, secondary)
+    assert groups[1] == {'start': 5000, 'end': 6000, 'primary': [], 'secondary': ["en"]}
+
+
+def test_alignment_stays_fast_with_long_cue(subtools):
+    primary = make_track(40000, seed=5, long_cue=True)
+    secondary = make_translation(primary, seed=6)
+    started = time.perf_counter()
+    groups = subtools.align_subtitle_tracks(primary, secondary)
+    assert time.perf_counter() - started < 10
+    matched = matches(groups)
+    assert matched["title"] == []
+    assert all(matched[f"line {i}"] == [f"en {i}"] for i in range(40000))
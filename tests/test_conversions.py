@@ -0,0 +1,138 @@
+import os
+
+VTT = """WEBVTT
+X-TIMESTAMP-MAP=LOCAL:00:00:00.000,MPEGTS:0
+
+NOTE hello
+
+1
+00:00:01.000 --> 00:00:02.500 position:50%
+&lrm;<i>こんにちは</i>📱
+
+2
+00:00:03.000 --> 00:00:04.000
+<c.yellow>世界</c>
+"""
+
+OVERLAPPING_SRT = """1
+00:00:01,000 --> 00:00:02,000
+上の行
+
+2
+00:00:01,000 --> 00:00:02,000
+下の行
+
+3
+00:00:03,000 --> 00:00:04,000
+次
+"""
+
+DUPLICATE_SRT = """1
+00:00:01,000 --> 00:00:02,000
+同じ
+
+2
+00:00:02,000 --> 00:00:03,000
+同じ
+
+3
+00:00:03,000 --> 00:00:04,000
+違う
+"""
+
+ASS = r"""[Script Info]
+ScriptType: v4.00+
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,2,2,2,10,10,10,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+Dialogue: 0,0:00:01.00,0:00:02.00,Default,,0,0,0,,{\pos(10,20)}上の行\N
+Dialogue: 0,0:00:01.00,0:00:02.00,Default,,0,0,0,,{\an8}下の行
+Dialogue: 0,0:00:03.00,0:00:04.00,Default,,0,0,0,,{\c&H00ffff&}次
+"""
+
+TTML = """<?xml version="1.0" encoding="UTF-8"?>
+<root><cuepoints>
+<cuepoint time="1.500"><subtitle xx="100" yy="200">(太郎)おはよう</subtitle><subtitle xx="100" yy="250">ございます</subtitle></cuepoint>
+<cuepoint time="3.250"></cuepoint>
+<cuepoint time="4.000"><subtitle xx="300" yy="600">さようなら</subtitle></cuepoint>
+<cuepoint time="3725.100"></cuepoint>
+</cuepoints></root>
+"""
+
+
+def write(path, content, encoding="utf-8"):
+    with open(path, "w", encoding=encoding) as f:
+        f.write(content)
+    return str(path)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_preprocess_vtt_matches_content(subtools, tmp_path):
+    source = write(tmp_path / "in.vtt", VTT)
+    subtools.preprocess_vtt(source, str(tmp_path / "out.srt"))
+    assert read(tmp_path / "out.srt") == subtools.preprocess_vtt_content(VTT)
+    assert "00:00:01,000 --> 00:00:02,500" in read(tmp_path / "out.srt")
+
+
+def test_clean_srt_file_matches_content(subtools, tmp_path):
+    source = write(tmp_path / "in.srt", VTT)
+    output = subtools.clean_srt_file(source)
+    assert read(output) == subtools.clean_srt_content(VTT)
+    assert "WEBVTT" not in read(output) and "📱" not in read(output)
+
+
+def test_parse_ttml_file_matches_content(subtools, tmp_path):
+    source = write(tmp_path / "in.ttml", TTML)
+    for extension in ("srt", "ass"):
+        output = str(tmp_path / f"out.{extension}")
+        subtools.parse_ttml_file(source, output, extension)
+        assert read(output) == subtools.convert_ttml_content(TTML, extension, title=output)
+    assert "00:00:04,000 --> 01:02:05,100\nさようなら" in read(tmp_path / "out.srt")
+
+
+def test_fix_overlapping_subtitles_matches_content(subtools, tmp_path):
+    source = write(tmp_path / "in.srt", OVERLAPPING_SRT)
+    subtools.fix_overlapping_subtitles(source)
+    output = read(tmp_path / "in.fixed.srt")
+    assert output == subtools.fix_overlapping_content(OVERLAPPING_SRT)
+    assert output == "1\n00:00:01,000 --> 00:00:02,000\n上の行\n下の行\n\n2\n00:00:03,000 --> 00:00:04,000\n次\n\n"
+
+
+def test_fix_overlapping_subtitles_reads_shift_jis(subtools, tmp_path):
+    source = write(tmp_path / "in.srt", OVERLAPPING_SRT, encoding="shift-jis")
+    subtools.fix_overlapping_subtitles(source)
+    assert read(tmp_path / "in.fixed.srt") == subtools.fix_overlapping_content(OVERLAPPING_SRT)
+
+
+def test_fix_overlapping_content_skips_malformed_lines(subtools):
+    warnings = []
+    output = subtools.fix_overlapping_content("00:00:01,000 --> 00:00:02,000\nstray\n\n" + OVERLAPPING_SRT, warnings)
+    assert output == subtools.fix_overlapping_content(OVERLAPPING_SRT)
+    assert warnings == [
+        "Skipping malformed line: 00:00:01,000 --> 00:00:02,000",
+        "Skipping malformed line: stray",
+    ]
+
+
+def test_merge_duplicate_subtitles_matches_content(subtools, tmp_path):
+    source = write(tmp_path / "in.srt", DUPLICATE_SRT)
+    subtools.merge_duplicate_subtitles01(source)
+    output = read(tmp_path / "in_merged.srt")
+    assert output == subtools.merge_duplicate_content(DUPLICATE_SRT)
+    assert "00:00:01,000 --> 00:00:03,000\n同じ" in output
+
+
+def test_cleanup_ass_file_matches_content_without_temp_files(subtools, tmp_path):
+    source = write(tmp_path / "in.ass", ASS)
+    output = subtools.cleanup_ass_file(source)
+    assert read(output) == subtools.cleanup_ass_content(ASS)
+    assert read(output) == "1\n00:00:01,000 --> 00:00:02,000\n上の行\n下の行\n\n2\n00:00:03,000 --> 00:00:04,000\n次\n\n"
+    assert sorted(os.listdir(tmp_path)) == ["in.ass", "in.cleaned.srt"]
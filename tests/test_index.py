@@ -0,0 +1,97 @@
+import os
+import sqlite3
+
+
+def ms_to_srt(ms):
+    return f"{ms // 3600000:02}:{ms // 60000 % 60:02}:{ms // 1000 % 60:02},{ms % 1000:03}"
+
+
+def write_srt(path, cues):
+    """Write (number, start ms, text) cues as an SRT file, each one second long."""
+    with open(path, "w", encoding="utf-8") as f:
+        for number, start, text in cues:
+            f.write(f"{number}\n{ms_to_srt(start)} --> {ms_to_srt(start + 1000)}\n{text}\n\n")
+
+
+def build(subtools, folder, capsys):
+    subtools.build_subtitle_index(str(folder))
+    return capsys.readouterr().out
+
+
+def test_rebuild_skips_unchanged_files(subtools, tmp_path, capsys):
+    write_srt(tmp_path / "a.srt", [(1, 0, "おはよう")])
+    write_srt(tmp_path / "b.srt", [(1, 0, "こんにちは")])
+    assert "2 files, 2 changed" in build(subtools, tmp_path, capsys)
+    assert "2 files, 0 changed" in build(subtools, tmp_path, capsys)
+
+
+def test_changed_file_is_reindexed(subtools, tmp_path, capsys):
+    path = tmp_path / "a.srt"
+    write_srt(path, [(1, 0, "おはよう")])
+    build(subtools, tmp_path, capsys)
+    write_srt(path, [(1, 0, "こんばんは、皆さん")])
+    assert "1 files, 1 changed" in build(subtools, tmp_path, capsys)
+    assert subtools.search_subtitle_index(str(tmp_path), "おはよう") == []
+    assert [row[3] for row in subtools.search_subtitle_index(str(tmp_path), "こんばんは")] == ["こんばんは、皆さん"]
+
+
+def test_deleted_file_is_dropped(subtools, tmp_path, capsys):
+    write_srt(tmp_path / "a.srt", [(1, 0, "おはよう")])
+    write_srt(tmp_path / "b.srt", [(1, 0, "おはようございます")])
+    build(subtools, tmp_path, capsys)
+    os.remove(tmp_path / "a.srt")
+    assert "1 files, 1 changed" in build(subtools, tmp_path, capsys)
+    assert [row[0] for row in subtools.search_subtitle_index(str(tmp_path), "おはよう")] == ["b.srt"]
+
+    # Posting counts stay in step with the postings themselves
+    db = sqlite3.connect(tmp_path / subtools.INDEX_FILENAME)
+    stale = db.execute("""
+        SELECT COUNT(*) FROM terms
+        LEFT JOIN (SELECT term, COUNT(*) AS n FROM postings GROUP BY term) AS p ON p.term = terms.term
+        WHERE p.n IS NOT terms.postings
+    """).fetchone()[0]
+    db.close()
+    assert stale == 0
+
+
+def test_outputs_written_into_an_indexed_folder_are_added(subtools, tmp_path, capsys):
+    build(subtools, tmp_path, capsys)
+    with open(tmp_path / "ep.srt", "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n1\n00:00:01,000 --> 00:00:02,000\n新しい行\n\n")
+    subtools.clean_srt_file(str(tmp_path / "ep.srt"))
+    paths = {row[0] for row in subtools.search_subtitle_index(str(tmp_path), "新しい")}
+    assert "ep.cleaned.srt" in paths
+
+
+def test_results_report_srt_cue_numbers_and_start(subtools, tmp_path, capsys):
+    write_srt(tmp_path / "a.srt", [(5, 1000, "おはよう"), (7, 2000, ""), (9, 3000, "さようなら")])
+    build(subtools, tmp_path, capsys)
+    assert subtools.search_subtitle_index(str(tmp_path), "さようなら") == [("a.srt", 9, 3000, "さようなら")]
+
+
+def test_single_character_and_full_width_queries(subtools, tmp_path, capsys):
+    write_srt(tmp_path / "a.srt", [(1, 0, "ＡＢＣ"), (2, 1000, "x y")])
+    build(subtools, tmp_path, capsys)
+    for query in ("a", "Ａ", "abc", "ＡＢＣ", "Abc"):
+        assert [row[1] for row in subtools.search_subtitle_index(str(tmp_path), query)] == [1], query
+    # Whitespace is ignored on both sides
+    assert [row[1] for row in subtools.search_subtitle_index(str(tmp_path), "xy")] == [2]
+    assert subtools.search_subtitle_index(str(tmp_path), "zz") == []
+
+
+def test_search_stops_at_limit(subtools, tmp_path, capsys):
+    write_srt(tmp_path / "a.srt", [(i, i * 1000, "そうですね") for i in range(1, 21)])
+    build(subtools, tmp_path, capsys)
+    assert len(subtools.search_subtitle_index(str(tmp_path), "そうですね", limit=3)) == 3
+    assert len(subtools.search_subtitle_index(str(tmp_path), "す", limit=3)) == 3
+    assert len(subtools.search_subtitle_index(str(tmp_path), "そうですね")) == 20
+
+
+def test_index_from_an_older_layout_is_rebuilt(subtools, tmp_path, capsys):
+    db = sqlite3.connect(tmp_path / subtools.INDEX_FILENAME)
+    db.execute("CREATE TABLE cues (file_id INTEGER, cue INTEGER, text TEXT)")
+    db.commit()
+    db.close()
+    write_srt(tmp_path / "a.srt", [(1, 0, "おはよう")])
+    build(subtools, tmp_path, capsys)
+    assert len(subtools.search_subtitle_index(str(tmp_path), "おはよう")) == 1
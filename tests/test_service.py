@@ -0,0 +1,117 @@
+import http.client
+import json
+import socket
+import threading
+from multiprocessing.pool import ThreadPool
+
+import pytest
+
+
+@pytest.fixture
+def server(subtools):
+    # A thread pool stands in for the process pool; the handler only needs apply_async
+    pool = ThreadPool(1)
+    server = subtools.ConversionServer(("127.0.0.1", 0), pool, max_pending=1, request_timeout=5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    pool.terminate()
+
+
+def request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    result = (response.status, dict(response.getheaders()), response.read().decode("utf-8"))
+    connection.close()
+    return result
+
+
+def raw_request(server, data):
+    with socket.create_connection(server.server_address, timeout=10) as sock:
+        sock.sendall(data)
+        return int(sock.recv(1024).split(b" ")[1])
+
+
+def test_converts_request_body(subtools, server):
+    body = "1\n00:00:01,000 --> 00:00:02,000\nA\n\n2\n00:00:01,000 --> 00:00:02,000\nB\n"
+    status, headers, text = request(server, "POST", "/fix_overlapping_subtitles", body.encode("utf-8"))
+    assert status == 200
+    assert text == subtools.fix_overlapping_content(body)
+    assert headers["X-Subtools-Warnings"] == "0"
+
+
+def test_passes_query_options(subtools, server):
+    ttml = '<root><cuepoints><cuepoint time="1.0"><subtitle xx="0" yy="0">a</subtitle></cuepoint><cuepoint time="2.0"></cuepoint></cuepoints></root>'
+    status, _, text = request(server, "POST", "/parse_ttml_file?extension=ass", ttml.encode("utf-8"))
+    assert status == 200
+    assert text == subtools.convert_ttml_content(ttml, "ass")
+
+
+def test_unknown_operation_is_404(server):
+    assert request(server, "POST", "/nope", b"x")[0] == 404
+    assert request(server, "GET", "/nope")[0] == 404
+
+
+def test_missing_or_chunked_body_is_411(server):
+    assert raw_request(server, b"POST /dedupe HTTP/1.1\r\nHost: x\r\n\r\n") == 411
+    assert raw_request(server, b"POST /dedupe HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n1\r\nx\r\n0\r\n\r\n") == 411
+
+
+def test_bad_content_length_is_400(server):
+    assert raw_request(server, b"POST /dedupe HTTP/1.1\r\nHost: x\r\nContent-Length: abc\r\n\r\n") == 400
+    assert raw_request(server, b"POST /dedupe HTTP/1.1\r\nHost: x\r\nContent-Length: -1\r\n\r\n") == 400
+
+
+def test_bad_input_is_400(server):
+    assert request(server, "POST", "/parse_ttml_file?extension=txt", b"<root/>")[0] == 400
+    assert request(server, "POST", "/clean_srt_file", b"\xff\xfe\xfa")[0] == 400
+
+
+def test_malformed_srt_is_skipped_not_500(server):
+    status, headers, text = request(server, "POST", "/fix_overlapping_subtitles", b"00:00:01,000 --> 00:00:02,000\nstray\n")
+    assert (status, text, headers["X-Subtools-Warnings"]) == (200, "", "2")
+
+
+def test_oversized_body_is_413(subtools, server, monkeypatch):
+    monkeypatch.setattr(subtools, "MAX_REQUEST_BYTES", 4)
+    assert request(server, "POST", "/dedupe", b"12345")[0] == 413
+
+
+def test_busy_server_answers_503_with_retry_after(subtools, server, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def block(content):
+        started.set()
+        release.wait(5)
+        return content
+
+    monkeypatch.setitem(subtools.SERVICE_OPERATIONS, "block", block)
+    first = threading.Thread(target=request, args=(server, "POST", "/block", b"x"))
+    first.start()
+    assert started.wait(5)
+
+    status, headers, _ = request(server, "POST", "/clean_srt_file", b"x")
+    assert status == 503
+    assert headers["Retry-After"] == "1"
+
+    release.set()
+    first.join(5)
+    assert request(server, "POST", "/clean_srt_file", b"x")[0] == 200
+    assert server.stats.snapshot()["rejected"] == 1
+
+
+def test_stats_report_counters(server):
+    request(server, "POST", "/clean_srt_file", b"WEBVTT\nhello")
+    request(server, "POST", "/parse_ttml_file?extension=txt", b"<root/>")
+    status, headers, text = request(server, "GET", "/stats")
+    assert status == 200
+    assert headers["Content-Type"] == "application/json"
+    stats = json.loads(text)
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == 0
+    assert stats["operations"]["clean_srt_file"]["requests"] == 1
+    assert stats["operations"]["parse_ttml_file"]["errors"] == 1
+    assert set(stats["operations"]["clean_srt_file"]) == {"requests", "errors", "avg_ms", "p50_ms", "p95_ms", "max_ms"}